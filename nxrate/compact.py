@@ -0,0 +1,256 @@
+"""
+Memory-compact array storage for rate matrices and distributions.
+
+Rates and probabilities are stored with a narrow floating point dtype,
+float32 by default, and state indices are stored with the narrowest
+integer dtype that fits the number of states.
+Flows are accumulated in float64, and the tolerances of the checks
+in this module are widened to the precision of the stored dtype.
+
+The checks in this module mirror those in nxrate.testing and raise
+the same exceptions.  The support of a distribution stored as an array
+consists of the states with positive probability.
+
+Glossary of naming conventions in this module.
+    distn : finite distribution over keys of a Python dict
+    Q : rate matrix as an nx.DiGraph
+    cQ : rate matrix as a CompactRateMatrix
+    p : distribution as an array aligned with the states of cQ
+
+"""
+from __future__ import division, print_function, absolute_import
+
+import networkx as nx
+import numpy as np
+
+from .testing import (
+        RateMatrixError, LocalDistnError, GlobalDistnError,
+        UnweightedEquilibriumError, WeightedEquilibriumError,
+        UnweightedDetailedBalanceError, WeightedDetailedBalanceError)
+from .util import isclose
+
+__all__ = [
+        'CompactRateMatrix', 'get_index_dtype',
+        'assert_distn', 'assert_rate_matrix',
+        'assert_equilibrium', 'assert_detailed_balance',
+        ]
+
+
+def get_index_dtype(nstates):
+    """
+    Get the narrowest signed integer dtype for indices of nstates states.
+
+    """
+    for dtype in np.int16, np.int32:
+        if nstates - 1 <= np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+
+class CompactRateMatrix(object):
+    """
+    Rate matrix stored as arrays of edge endpoints and rates.
+
+    Parameters
+    ----------
+    Q : nx.DiGraph
+        rate matrix
+    states : sequence, optional
+        ordered states, defaulting to the nodes of Q;
+        include any states of distributions that are not nodes of Q
+    dtype : dtype, optional
+        floating point dtype of the stored rates and probabilities
+
+    """
+    def __init__(self, Q, states=None, dtype=np.float32):
+        if states is None:
+            states = list(Q)
+        self.states = list(states)
+        self.dtype = np.dtype(dtype)
+        nstates = len(self.states)
+        index_dtype = get_index_dtype(nstates)
+        s_to_i = dict((s, i) for i, s in enumerate(self.states))
+        nnz = Q.number_of_edges()
+        self.row = np.empty(nnz, dtype=index_dtype)
+        self.col = np.empty(nnz, dtype=index_dtype)
+        self.rates = np.empty(nnz, dtype=self.dtype)
+        for k, (sa, sb) in enumerate(Q.edges()):
+            self.row[k] = s_to_i[sa]
+            self.col[k] = s_to_i[sb]
+            self.rates[k] = Q[sa][sb]['weight']
+
+    @property
+    def nstates(self):
+        return len(self.states)
+
+    @property
+    def nbytes(self):
+        return self.row.nbytes + self.col.nbytes + self.rates.nbytes
+
+    def get_distn_array(self, distn):
+        """
+        Store a distribution as an array aligned with the states.
+
+        """
+        return np.array([distn.get(s, 0) for s in self.states],
+                dtype=self.dtype)
+
+    def get_distn(self, p):
+        """
+        Convert a distribution array to a dict over its support.
+
+        """
+        return dict((s, v) for s, v in zip(self.states, p.tolist()) if v > 0)
+
+    def get_exit_rates(self):
+        """
+        Total rate out of each state, accumulated in float64.
+
+        """
+        return np.bincount(self.row, weights=self.rates.astype(np.float64),
+                minlength=self.nstates)
+
+    def to_nx(self):
+        Q = nx.DiGraph()
+        Q.add_nodes_from(self.states)
+        for i, j, rate in zip(self.row.tolist(), self.col.tolist(),
+                self.rates.tolist()):
+            Q.add_edge(self.states[i], self.states[j], weight=rate)
+        return Q
+
+
+def assert_distn(p, states=None):
+    """
+
+    Parameters
+    ----------
+    p : ndarray
+        finite distribution stored as an array
+    states : sequence, optional
+        states used in error messages, defaulting to the indices
+
+    """
+    if states is None:
+        states = range(len(p))
+    dtype = p.dtype
+    i = int(np.argmin(p))
+    if p[i] < 0:
+        raise LocalDistnError('probabilities must be non-negative, '
+                'but found prob(%s) : %f' % (states[i], p[i]), [states[i]])
+    i = int(np.argmax(p))
+    if p[i] > 1:
+        raise LocalDistnError('probabilities must not be greater than 1, '
+                'but found prob(%s) : %f' % (states[i], p[i]), [states[i]])
+    total = p.sum(dtype=np.float64)
+    if not isclose(total, 1, dtype=dtype):
+        raise GlobalDistnError('probabilities should add up to 1, '
+                'but found total : %f' % total)
+
+
+def assert_rate_matrix(cQ):
+    loops = np.flatnonzero(cQ.row == cQ.col)
+    if loops.size:
+        s = cQ.states[cQ.row[loops[0]]]
+        raise RateMatrixError('self-transitions are not allowed '
+                'in this networkx representation of rate matrices', [s])
+    negative = np.flatnonzero(cQ.rates < 0)
+    if negative.size:
+        k = negative[0]
+        sa = cQ.states[cQ.row[k]]
+        sb = cQ.states[cQ.col[k]]
+        raise RateMatrixError('negative rate '
+                'from %s to %s: %f' % (sa, sb, cQ.rates[k]), [sa, sb])
+
+
+def _get_flows(cQ, p):
+    """
+    Compute float64 flows along edges leaving the support of p.
+
+    Returns
+    -------
+    row, col : ndarray
+        endpoints of the edges with flow, as int64 indices
+    flows : ndarray
+        float64 flows along these edges
+
+    """
+    if p.shape != (cQ.nstates,):
+        raise Exception('expected a distribution over %d states' % (
+            cQ.nstates))
+    mask = p[cQ.row] > 0
+    row = cQ.row[mask].astype(np.int64)
+    col = cQ.col[mask].astype(np.int64)
+    flows = p[row].astype(np.float64) * cQ.rates[mask].astype(np.float64)
+    return row, col, flows
+
+
+def assert_equilibrium(cQ, p, check_inputs=True):
+    """
+    Assert that the net flow out of each state is near zero.
+
+    """
+    if check_inputs:
+        assert_rate_matrix(cQ)
+        assert_distn(p, cQ.states)
+    row, col, flows = _get_flows(cQ, p)
+    n = cQ.nstates
+    has_out = np.bincount(row, minlength=n) > 0
+    has_in = np.bincount(col, minlength=n) > 0
+
+    imba = np.flatnonzero(has_out & ~has_in)
+    if imba.size:
+        states = [cQ.states[i] for i in imba]
+        raise UnweightedEquilibriumError('the following states have flow out '
+                'but not in: %s' % str(states), states)
+    imba = np.flatnonzero(has_in & ~has_out)
+    if imba.size:
+        states = [cQ.states[i] for i in imba]
+        raise UnweightedEquilibriumError('the following states have flow in '
+                'but not out: %s' % str(states), states)
+
+    flow_in = np.bincount(col, weights=flows, minlength=n)
+    flow_out = np.bincount(row, weights=flows, minlength=n)
+    bad = np.flatnonzero(~isclose(flow_in, flow_out, dtype=cQ.dtype))
+    if bad.size:
+        i = bad[0]
+        s = cQ.states[i]
+        raise WeightedEquilibriumError('equilibrium fails for state %s: '
+                'flow in: %f  flow out: %f' % (
+                    s, flow_in[i], flow_out[i]), [s])
+
+
+def assert_detailed_balance(cQ, p, check_inputs=True):
+    if check_inputs:
+        assert_rate_matrix(cQ)
+        assert_distn(p, cQ.states)
+    row, col, flows = _get_flows(cQ, p)
+    n = cQ.nstates
+    if not flows.size:
+        return
+
+    # Find the reverse of each edge with flow.
+    keys = row * n + col
+    order = np.argsort(keys)
+    sorted_keys = keys[order]
+    reverse_keys = col * n + row
+    pos = np.searchsorted(sorted_keys, reverse_keys)
+    pos[pos == len(keys)] = 0
+    found = sorted_keys[pos] == reverse_keys
+
+    imba = np.flatnonzero(~found)
+    if imba.size:
+        pairs = [(cQ.states[row[k]], cQ.states[col[k]]) for k in imba]
+        raise UnweightedDetailedBalanceError('detailed balance fails '
+                'because only the forward direction of flow exists '
+                'for the following state pairs: %s' % str(pairs), pairs)
+
+    reverse_flows = flows[order[pos]]
+    bad = np.flatnonzero(~isclose(flows, reverse_flows, dtype=cQ.dtype))
+    if bad.size:
+        k = bad[0]
+        sa = cQ.states[row[k]]
+        sb = cQ.states[col[k]]
+        raise WeightedDetailedBalanceError('detailed balance fails '
+                'for state pair (%s, %s): '
+                'forward flow: %f  backward flow: %f' % (
+                    sa, sb, flows[k], reverse_flows[k]), [sa, sb])
@@ -0,0 +1,165 @@
+"""
+Functions for computing equilibrium distributions of rate matrices
+and their derivatives with respect to the rates.
+
+In this module, each state is hashable.
+
+Glossary of naming conventions in this module.
+    distn : finite distribution over keys of a Python dict
+    Q : rate matrix as an nx.DiGraph
+    states : ordered list of states defining matrix rows and columns
+
+"""
+from __future__ import division, print_function, absolute_import
+
+import numpy as np
+import scipy.sparse
+import scipy.sparse.linalg
+
+__all__ = ['get_equilibrium_distn', 'get_equilibrium_gradient']
+
+
+def _get_states(Q, states):
+    if states is None:
+        states = list(Q)
+    else:
+        states = list(states)
+    if len(set(states)) != len(states):
+        raise Exception('the states should be distinct')
+    if not states:
+        raise Exception('the rate matrix has no states')
+    return states
+
+
+def _get_equilibrium_system(Q, states):
+    """
+    Build the sparse linear system whose solution is the equilibrium.
+
+    The transposed rate matrix has its first row replaced by ones,
+    so that the system enforces both zero net flow and normalization.
+
+    Returns
+    -------
+    A : scipy.sparse.csc_matrix
+        square system matrix
+    b : ndarray
+        right hand side
+
+    """
+    nstates = len(states)
+    s_to_i = dict((s, i) for i, s in enumerate(states))
+    rows = []
+    cols = []
+    data = []
+    exit_rates = np.zeros(nstates)
+    for sa, sb in Q.edges():
+        rate = Q[sa][sb]['weight']
+        i = s_to_i[sa]
+        j = s_to_i[sb]
+        exit_rates[i] += rate
+        if j:
+            rows.append(j)
+            cols.append(i)
+            data.append(rate)
+    for i in range(1, nstates):
+        rows.append(i)
+        cols.append(i)
+        data.append(-exit_rates[i])
+    rows.extend([0] * nstates)
+    cols.extend(range(nstates))
+    data.extend([1] * nstates)
+    A = scipy.sparse.coo_matrix(
+            (data, (rows, cols)), shape=(nstates, nstates), dtype=float)
+    b = np.zeros(nstates)
+    b[0] = 1
+    return A.tocsc(), b
+
+
+def get_equilibrium_distn(Q, states=None):
+    """
+    Compute the equilibrium distribution of an irreducible rate matrix.
+
+    Parameters
+    ----------
+    Q : nx.DiGraph
+        rate matrix
+    states : sequence, optional
+        states of the process, defaulting to the nodes of Q
+
+    Returns
+    -------
+    distn : dict
+        equilibrium distribution
+
+    """
+    states = _get_states(Q, states)
+    if len(states) == 1:
+        return {states[0] : 1.0}
+    A, b = _get_equilibrium_system(Q, states)
+    p = scipy.sparse.linalg.splu(A).solve(b)
+    return dict(zip(states, p.tolist()))
+
+
+def get_equilibrium_gradient(Q, objective_gradient, states=None):
+    """
+    Differentiate an objective of the equilibrium distribution
+    with respect to each rate of an irreducible rate matrix.
+
+    The derivatives with respect to all rates are computed
+    from a single adjoint solve that reuses the sparse LU factorization
+    of the equilibrium system.
+
+    Parameters
+    ----------
+    Q : nx.DiGraph
+        rate matrix
+    objective_gradient : dict or callable
+        partial derivatives of the objective with respect to the
+        equilibrium probability of each state, missing states having
+        derivative zero; if callable, it is called with the equilibrium
+        distribution and returns such a dict
+    states : sequence, optional
+        states of the process, defaulting to the nodes of Q
+
+    Returns
+    -------
+    distn : dict
+        equilibrium distribution
+    edge_gradient : ndarray
+        derivative of the objective with respect to the rate of each edge,
+        aligned with the edges of Q in the order of Q.edges()
+
+    """
+    states = _get_states(Q, states)
+    s_to_i = dict((s, i) for i, s in enumerate(states))
+    nstates = len(states)
+    edges = list(Q.edges())
+    if nstates == 1:
+        lu = None
+        p = np.ones(1)
+    else:
+        A, b = _get_equilibrium_system(Q, states)
+        lu = scipy.sparse.linalg.splu(A)
+        p = lu.solve(b)
+    distn = dict(zip(states, p.tolist()))
+    if callable(objective_gradient):
+        objective_gradient = objective_gradient(distn)
+    g = np.zeros(nstates)
+    for s, v in objective_gradient.items():
+        g[s_to_i[s]] = v
+
+    # Solve the adjoint system.
+    # The first row of the system is the normalization constraint,
+    # which does not depend on the rates.
+    if lu is None:
+        lam = np.zeros(1)
+    else:
+        lam = lu.solve(g, trans='T')
+        lam[0] = 0
+
+    # The rate of the edge from state i to state j enters the system
+    # through the columns of the transposed rate matrix at state i.
+    src = np.array([s_to_i[sa] for sa, sb in edges], dtype=int)
+    dst = np.array([s_to_i[sb] for sa, sb in edges], dtype=int)
+    edge_gradient = -p[src] * (lam[dst] - lam[src])
+    return distn, edge_gradient
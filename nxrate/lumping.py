@@ -0,0 +1,232 @@
+"""
+Exact lumping of rate matrices by partition refinement.
+
+A partition of the states is a strong lumping if for every pair of
+distinct blocks B and C, the total rate from a state in B into C
+is the same for all states in B.
+The lumped process on the blocks is then itself a Markov process.
+
+A partition is an exact lumping if for every pair of blocks B and C,
+the total rate into a state in B from C is the same for all states in B,
+where the rate from a state to itself is minus its total exit rate.
+The equilibrium distribution of an exactly lumpable irreducible process
+is uniform within each block, so for a partition that is both strong
+and exact, the lumped equilibrium distribution lifts to the equilibrium
+distribution of the original process.
+
+Glossary of naming conventions in this module.
+    distn : finite distribution over keys of a Python dict
+    Q : rate matrix as an nx.DiGraph
+    state_to_block : dict mapping each state to an integer block label
+
+"""
+from __future__ import division, print_function, absolute_import
+
+from collections import defaultdict
+
+import networkx as nx
+
+from .util import isclose
+
+__all__ = [
+        'get_coarsest_lumping', 'get_lumped_rate_matrix', 'lift_distn',
+        ]
+
+
+def _split_by_weight(states, w, rtol, atol):
+    """
+    Group states whose total rates to or from the splitter are close.
+
+    """
+    pairs = sorted((w.get(s, 0), i, s) for i, s in enumerate(states))
+    groups = []
+    group_start = None
+    for weight, i, s in pairs:
+        if group_start is None or not isclose(
+                weight, group_start, rtol, atol):
+            group_start = weight
+            groups.append([])
+        groups[-1].append(s)
+    return groups
+
+
+def get_coarsest_lumping(Q, partition=None, exact=True,
+        rtol=1e-5, atol=1e-8):
+    """
+    Find the coarsest lumping that refines an initial partition.
+
+    Parameters
+    ----------
+    Q : nx.DiGraph
+        rate matrix
+    partition : dict, optional
+        maps states to initial block labels, for example observations
+        that must remain distinguishable after lumping;
+        by default all states start in a single block
+    exact : bool, optional
+        require the lumping to be exact as well as strong,
+        so that equilibrium distributions can be lifted;
+        a lumping that is only strong is trivial
+        unless an initial partition is provided
+    rtol, atol : float, optional
+        tolerances for deciding that two total rates are equal
+
+    Returns
+    -------
+    state_to_block : dict
+        maps each state to a block label in range(nblocks)
+
+    """
+    states = list(Q)
+    if partition is not None:
+        states.extend(s for s in partition if s not in Q)
+    exit_rates = dict((s, Q.out_degree(s, weight='weight')) for s in Q)
+
+    # Initialize the blocks.
+    blocks = {}
+    block_of = {}
+    label_to_block = {}
+    for s in states:
+        label = None if partition is None else partition[s]
+        if label not in label_to_block:
+            label_to_block[label] = len(blocks)
+            blocks[len(blocks)] = set()
+        b = label_to_block[label]
+        blocks[b].add(s)
+        block_of[s] = b
+
+    # Refine the blocks until the partition is stable
+    # with respect to every block.
+    worklist = list(blocks)
+    in_worklist = set(worklist)
+    while worklist:
+        c = worklist.pop()
+        in_worklist.remove(c)
+
+        # Compute the total rate into the splitter from each state
+        # outside the splitter.
+        w_into = defaultdict(float)
+        for sb in blocks[c]:
+            for sa in Q.predecessors(sb):
+                if block_of[sa] != c:
+                    w_into[sa] += Q[sa][sb]['weight']
+        weights = [w_into]
+
+        # Compute the total rate from the splitter into each state.
+        if exact:
+            w_from = defaultdict(float)
+            for sa in blocks[c]:
+                w_from[sa] -= exit_rates.get(sa, 0)
+                if sa in Q:
+                    for sb in Q.successors(sa):
+                        w_from[sb] += Q[sa][sb]['weight']
+            weights.append(w_from)
+
+        # Split each block that has a state with a nonzero weight.
+        touched = set()
+        for w in weights:
+            touched.update(block_of[s] for s in w)
+        for b in touched:
+            groups = [list(blocks[b])]
+            for w in weights:
+                groups = [g for group in groups
+                        for g in _split_by_weight(group, w, rtol, atol)]
+            if len(groups) < 2:
+                continue
+            groups.sort(key=len, reverse=True)
+            blocks[b] = set(groups[0])
+            pieces = [b]
+            for group in groups[1:]:
+                new_b = len(blocks)
+                blocks[new_b] = set(group)
+                for s in group:
+                    block_of[s] = new_b
+                pieces.append(new_b)
+            for piece in pieces:
+                if piece not in in_worklist:
+                    worklist.append(piece)
+                    in_worklist.add(piece)
+
+    # Relabel the blocks in order of first appearance.
+    relabel = {}
+    state_to_block = {}
+    for s in states:
+        b = block_of[s]
+        if b not in relabel:
+            relabel[b] = len(relabel)
+        state_to_block[s] = relabel[b]
+    return state_to_block
+
+
+def get_lumped_rate_matrix(Q, state_to_block):
+    """
+    Build the rate matrix of the lumped process.
+
+    The rate from block B to block C is the total rate
+    from a representative state of B into C.
+
+    Parameters
+    ----------
+    Q : nx.DiGraph
+        rate matrix
+    state_to_block : dict
+        strong lumping of the states of Q
+
+    Returns
+    -------
+    lumped_Q : nx.DiGraph
+        rate matrix over block labels
+
+    """
+    representatives = {}
+    for s, b in state_to_block.items():
+        if b not in representatives:
+            representatives[b] = s
+    lumped_Q = nx.DiGraph()
+    lumped_Q.add_nodes_from(representatives)
+    for b, sa in representatives.items():
+        if sa not in Q:
+            continue
+        rates = defaultdict(float)
+        for sb in Q.successors(sa):
+            c = state_to_block[sb]
+            if c != b:
+                rates[c] += Q[sa][sb]['weight']
+        for c, rate in rates.items():
+            lumped_Q.add_edge(b, c, weight=rate)
+    return lumped_Q
+
+
+def lift_distn(lumped_distn, state_to_block, weights=None):
+    """
+    Spread the probability of each block over the states of the block.
+
+    With the default uniform weights, the equilibrium distribution
+    of the lumped process lifts to the equilibrium distribution
+    of the original process when the lumping is exact.
+
+    Parameters
+    ----------
+    lumped_distn : dict
+        finite distribution over block labels
+    state_to_block : dict
+        maps each state to a block label
+    weights : dict, optional
+        positive relative weights of states within their blocks
+
+    Returns
+    -------
+    distn : dict
+        finite distribution over the states
+
+    """
+    totals = defaultdict(float)
+    for s, b in state_to_block.items():
+        totals[b] += 1 if weights is None else weights[s]
+    distn = {}
+    for s, b in state_to_block.items():
+        p = lumped_distn.get(b, 0)
+        if p:
+            w = 1 if weights is None else weights[s]
+            distn[s] = p * w / totals[b]
+    return distn
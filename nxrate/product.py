@@ -0,0 +1,182 @@
+"""
+Rate matrices of product chains with independently evolving factors.
+
+The product chain has a state for each combination of factor states,
+and each transition changes exactly one factor state at the rate
+given by the rate matrix of that factor.
+The rate matrix of the product chain is the Kronecker sum
+of the factor rate matrices, and it is never built explicitly.
+
+Glossary of naming conventions in this module.
+    distn : finite distribution over keys of a Python dict
+    Q : rate matrix as an nx.DiGraph
+    Qs : sequence of factor rate matrices as nx.DiGraphs
+
+"""
+from __future__ import division, print_function, absolute_import
+
+from functools import reduce
+from itertools import product
+
+import numpy as np
+import scipy.sparse.linalg
+
+from .equilibrium import get_equilibrium_distn
+from .util import get_sparse_rate_matrix
+from . import testing
+
+__all__ = ['ProductRateMatrix']
+
+
+class ProductRateMatrix(object):
+    """
+    Rate matrix of a product of independent chains.
+
+    States of the product chain are tuples with one entry per factor.
+    Vectors over product states are flattened in row-major order
+    with respect to the factor state lists.
+
+    Parameters
+    ----------
+    Qs : sequence of nx.DiGraph
+        factor rate matrices
+    factor_states : sequence of sequences, optional
+        ordered states of each factor, defaulting to the factor nodes
+
+    """
+    def __init__(self, Qs, factor_states=None):
+        self.Qs = list(Qs)
+        if not self.Qs:
+            raise Exception('at least one factor is required')
+        if factor_states is None:
+            factor_states = [list(Q) for Q in self.Qs]
+        self.factor_states = [list(states) for states in factor_states]
+        if len(self.factor_states) != len(self.Qs):
+            raise Exception('expected one state list per factor')
+        for states in self.factor_states:
+            if not states:
+                raise Exception('each factor needs at least one state')
+        self.shape = tuple(len(states) for states in self.factor_states)
+        self.nstates = int(np.prod(self.shape))
+        self._factor_matrices = [get_sparse_rate_matrix(Q, states).toarray()
+                for Q, states in zip(self.Qs, self.factor_states)]
+        self._factor_maps = [dict((s, i) for i, s in enumerate(states))
+                for states in self.factor_states]
+
+    def states(self):
+        """
+        Iterate over product states in the flattened vector order.
+
+        """
+        return product(*self.factor_states)
+
+    def state_to_index(self, state):
+        idx = [m[s] for m, s in zip(self._factor_maps, state)]
+        return int(np.ravel_multi_index(idx, self.shape))
+
+    def index_to_state(self, index):
+        idx = np.unravel_index(index, self.shape)
+        return tuple(states[i] for states, i in zip(self.factor_states, idx))
+
+    def get_factor_equilibrium_distns(self):
+        return [get_equilibrium_distn(Q, states)
+                for Q, states in zip(self.Qs, self.factor_states)]
+
+    def _get_factor_arrays(self, distns):
+        if distns is None:
+            distns = self.get_factor_equilibrium_distns()
+        if len(distns) != len(self.Qs):
+            raise Exception('expected one distribution per factor')
+        return [np.array([d.get(s, 0) for s in states], dtype=float)
+                for d, states in zip(distns, self.factor_states)]
+
+    def get_equilibrium_array(self, distns=None):
+        """
+        Flattened equilibrium distribution of the product chain.
+
+        Parameters
+        ----------
+        distns : sequence of dicts, optional
+            factor equilibrium distributions, computed if not provided
+
+        """
+        arrs = self._get_factor_arrays(distns)
+        return reduce(np.multiply.outer, arrs).ravel()
+
+    def get_equilibrium_distn(self, distns=None):
+        """
+        Equilibrium distribution over product states as a dict.
+
+        Only states with positive probability are included.
+
+        """
+        p = self.get_equilibrium_array(distns)
+        return dict((s, v) for s, v in zip(self.states(), p.tolist()) if v)
+
+    def assert_equilibrium(self, distns, check_inputs=True):
+        """
+        Assert that the product of factor distributions is an equilibrium.
+
+        The product distribution has zero net flow out of each product
+        state if and only if each factor distribution has zero net flow
+        out of each factor state, so only the factors are checked.
+
+        """
+        if len(distns) != len(self.Qs):
+            raise Exception('expected one distribution per factor')
+        for Q, distn in zip(self.Qs, distns):
+            testing.assert_equilibrium(Q, distn, check_inputs=check_inputs)
+
+    def assert_detailed_balance(self, distns, check_inputs=True):
+        """
+        Assert detailed balance of the product of factor distributions.
+
+        Each product transition changes a single factor,
+        so detailed balance holds for the product chain if and only if
+        it holds for each factor.
+
+        """
+        if len(distns) != len(self.Qs):
+            raise Exception('expected one distribution per factor')
+        for Q, distn in zip(self.Qs, distns):
+            testing.assert_detailed_balance(Q, distn,
+                    check_inputs=check_inputs)
+
+    def _apply(self, v, transpose):
+        v = np.asarray(v, dtype=float)
+        extra = v.shape[1:]
+        if v.shape[0] != self.nstates:
+            raise Exception('expected %d rows but found %d' % (
+                self.nstates, v.shape[0]))
+        V = v.reshape(self.shape + extra)
+        out = np.zeros_like(V)
+        for axis, M in enumerate(self._factor_matrices):
+            if transpose:
+                M = M.T
+            W = np.tensordot(M, V, axes=([1], [axis]))
+            out += np.moveaxis(W, 0, axis)
+        return out.reshape(v.shape)
+
+    def dot(self, v):
+        """
+        Compute the matrix product Q v.
+
+        The cost is proportional to the sum of the factor sizes
+        times the number of product states.
+
+        """
+        return self._apply(v, transpose=False)
+
+    def rdot(self, p):
+        """
+        Compute the matrix product p Q, for example the time derivative
+        of a distribution over product states.
+
+        """
+        return self._apply(p, transpose=True)
+
+    def as_linear_operator(self):
+        return scipy.sparse.linalg.LinearOperator(
+                (self.nstates, self.nstates),
+                matvec=self.dot, rmatvec=self.rdot,
+                matmat=self.dot, dtype=float)
@@ -0,0 +1,197 @@
+"""
+Felsenstein pruning likelihoods of leaf data on a tree.
+
+The rate matrix and its equilibrium distribution define a substitution
+model, with the equilibrium distribution as the prior at the root.
+Likelihoods of all columns of the leaf data are computed together,
+after compressing the columns into unique patterns.
+
+Glossary of naming conventions in this module.
+    distn : finite distribution over keys of a Python dict
+    Q : rate matrix as an nx.DiGraph
+    T : tree as an nx.DiGraph with branch lengths as edge weights
+    P : transition probability matrix as a numpy array
+    data : (ncolumns, nleaves) array of state indices
+
+"""
+from __future__ import division, print_function, absolute_import
+
+import networkx as nx
+import numpy as np
+import scipy.linalg
+
+from .testing import (
+        assert_rate_matrix, assert_distn,
+        assert_equilibrium, assert_detailed_balance,
+        DetailedBalanceError)
+from .util import get_sparse_rate_matrix
+
+__all__ = ['PruningEngine']
+
+
+class PruningEngine(object):
+    """
+    Compute log likelihoods of leaf data on a tree.
+
+    Transition matrices are computed once per branch.
+    For a reversible model they all come from a single symmetric
+    eigendecomposition, whose spectral gap also identifies branches
+    long enough to use the equilibrium distribution directly.
+    Otherwise a matrix exponential is computed for each branch.
+
+    Parameters
+    ----------
+    T : nx.DiGraph
+        rooted tree with edges directed away from the root
+        and branch lengths as edge weights
+    Q : nx.DiGraph
+        rate matrix
+    distn : dict
+        equilibrium distribution of Q, used as the root prior
+    leaves : sequence, optional
+        leaves in the order of the data columns,
+        defaulting to the leaves of T in node order
+    states : sequence, optional
+        states in the order used by the state indices of the data,
+        defaulting to the nodes of Q
+    check_inputs : bool, optional
+        check the rate matrix, the distribution and the equilibrium
+
+    """
+    def __init__(self, T, Q, distn, leaves=None, states=None,
+            check_inputs=True):
+        if check_inputs:
+            assert_rate_matrix(Q)
+            assert_distn(distn)
+            assert_equilibrium(Q, distn, check_inputs=False)
+        if not nx.is_arborescence(T):
+            raise Exception('the tree should be a directed rooted tree')
+        roots = [v for v in T if not T.in_degree(v)]
+        self.T = T
+        self.root = roots[0]
+        if leaves is None:
+            leaves = [v for v in T if not T.out_degree(v)]
+        self.leaves = list(leaves)
+        if set(self.leaves) != set(v for v in T if not T.out_degree(v)):
+            raise Exception('expected each leaf of the tree exactly once')
+        if states is None:
+            states = list(Q)
+            states.extend(s for s in distn if s not in Q)
+        self.states = list(states)
+        self.prior = np.array([distn.get(s, 0) for s in self.states])
+        self.postorder = list(nx.dfs_postorder_nodes(T, self.root))
+        self.edge_to_P = self._get_transition_matrices(Q, distn)
+
+    def _is_reversible(self, Q, distn):
+        if not np.all(self.prior > 0):
+            return False
+        try:
+            assert_detailed_balance(Q, distn, check_inputs=False)
+        except DetailedBalanceError:
+            return False
+        return True
+
+    def _get_transition_matrices(self, Q, distn):
+        M = get_sparse_rate_matrix(Q, self.states).toarray()
+        self.reversible = self._is_reversible(Q, distn)
+        edge_to_P = {}
+        if self.reversible:
+            # Symmetrize by the equilibrium distribution
+            # and reuse the eigendecomposition for every branch.
+            r = np.sqrt(self.prior)
+            S = (r[:, None] * M / r[None, :])
+            w, U = scipy.linalg.eigh((S + S.T) / 2)
+            left = U / r[:, None]
+            right = U.T * r[None, :]
+
+            # Beyond this branch length, each transition probability
+            # is within machine precision of its equilibrium value.
+            # The eigenvalues are in ascending order and the largest
+            # one belongs to the equilibrium.
+            saturation = np.inf
+            gap = -w[-2] if len(w) > 1 else np.inf
+            if gap > 0:
+                ratio = self.prior.max() / self.prior.min()
+                eps = np.finfo(float).eps
+                saturation = np.log(np.sqrt(ratio) / eps) / gap
+            for na, nb in self.T.edges():
+                t = self.T[na][nb]['weight']
+                if t > saturation:
+                    P = np.tile(self.prior, (len(self.states), 1))
+                else:
+                    P = (left * np.exp(w * t)).dot(right)
+                edge_to_P[na, nb] = np.clip(P, 0, 1)
+        else:
+            for na, nb in self.T.edges():
+                t = self.T[na][nb]['weight']
+                P = scipy.linalg.expm(M * t)
+                edge_to_P[na, nb] = np.clip(P, 0, 1)
+        return edge_to_P
+
+    def _get_pattern_log_likelihoods(self, patterns):
+        npatterns = patterns.shape[0]
+        nstates = len(self.states)
+        leaf_to_column = dict((v, i) for i, v in enumerate(self.leaves))
+        node_to_L = {}
+        log_scale = np.zeros(npatterns)
+        rows = np.arange(npatterns)
+        for na in self.postorder:
+            if na in leaf_to_column:
+                idx = patterns[:, leaf_to_column[na]]
+                missing = idx < 0
+                L = np.zeros((npatterns, nstates))
+                L[rows[~missing], idx[~missing]] = 1
+                L[missing] = 1
+            else:
+                L = np.ones((npatterns, nstates))
+                for nb in self.T.successors(na):
+                    L *= node_to_L.pop(nb).dot(self.edge_to_P[na, nb].T)
+
+                    # Rescale the partial likelihoods to avoid underflow.
+                    m = L.max(axis=1)
+                    m[m == 0] = 1
+                    L /= m[:, None]
+                    log_scale += np.log(m)
+            node_to_L[na] = L
+        with np.errstate(divide='ignore'):
+            return np.log(node_to_L[self.root].dot(self.prior)) + log_scale
+
+    def _get_patterns(self, data):
+        data = np.asarray(data)
+        if data.ndim != 2 or data.shape[1] != len(self.leaves):
+            raise Exception('expected a (ncolumns, %d) array of state '
+                    'indices' % len(self.leaves))
+        if data.size and data.max() >= len(self.states):
+            raise Exception('state indices should be less than %d' % (
+                len(self.states)))
+        patterns, inverse, counts = np.unique(data, axis=0,
+                return_inverse=True, return_counts=True)
+        return patterns, inverse.ravel(), counts
+
+    def get_log_likelihoods(self, data):
+        """
+        Compute the log likelihood of each column of the leaf data.
+
+        Parameters
+        ----------
+        data : array_like
+            (ncolumns, nleaves) array of state indices,
+            with negative indices for missing data
+
+        Returns
+        -------
+        log_likelihoods : ndarray
+            (ncolumns,) log likelihoods
+
+        """
+        patterns, inverse, counts = self._get_patterns(data)
+        return self._get_pattern_log_likelihoods(patterns)[inverse]
+
+    def get_log_likelihood(self, data):
+        """
+        Compute the total log likelihood of the columns of the leaf data.
+
+        """
+        patterns, inverse, counts = self._get_patterns(data)
+        ll = self._get_pattern_log_likelihoods(patterns)
+        return ll.dot(counts)
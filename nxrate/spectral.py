@@ -0,0 +1,217 @@
+"""
+Spectral gap and relaxation time estimates for rate matrices.
+
+The spectral gap is minus the real part of the eigenvalue of the rate
+matrix that is closest to zero among the eigenvalues other than zero
+itself, and the relaxation time is its reciprocal.
+Large relaxation times relative to the time scales of interest,
+or large ratios of the fastest rates to the spectral gap,
+indicate stiff rate matrices.
+
+Glossary of naming conventions in this module.
+    distn : finite distribution over keys of a Python dict
+    Q : rate matrix as an nx.DiGraph
+
+"""
+from __future__ import division, print_function, absolute_import
+
+from collections import namedtuple
+
+import numpy as np
+import scipy.linalg
+import scipy.sparse
+import scipy.sparse.linalg
+
+from .product import ProductRateMatrix
+from .testing import assert_detailed_balance, DetailedBalanceError
+from .util import get_sparse_rate_matrix
+
+__all__ = ['SpectralGap', 'get_spectral_gap', 'get_relaxation_time']
+
+
+SpectralGap = namedtuple('SpectralGap',
+        ['gap', 'relaxation_time', 'reversible', 'converged'])
+
+
+def _is_reversible(Q, distn, states):
+    if distn is None:
+        return False
+    if any(distn.get(s, 0) <= 0 for s in states):
+        return False
+    try:
+        assert_detailed_balance(Q, distn, check_inputs=False)
+    except DetailedBalanceError:
+        return False
+    return True
+
+
+def _get_gap_from_eigenvalues(w):
+    # The eigenvalue nearest to zero belongs to the equilibrium.
+    re = np.sort(np.real(w))[::-1]
+    if len(re) < 2:
+        return np.nan
+    return max(-re[1], 0.0)
+
+
+def _get_nonreversible_eigenvalues(M, maxiter, tol, max_k):
+    """
+    Find enough eigenvalues near zero to certify the spectral gap.
+
+    By the Gershgorin theorem, each eigenvalue of a rate matrix lies
+    in the disk of radius q centered at -q, where q is the largest
+    exit rate.  Within that disk, eigenvalues with real part greater
+    than -g are within sqrt(2 q g) of zero.  So the gap g computed from
+    the eigenvalues nearest zero is exact once every eigenvalue
+    within that distance has been found.
+
+    Returns
+    -------
+    w : ndarray
+        eigenvalues found
+    converged : bool
+        True if the eigenvalues certify the spectral gap
+
+    """
+    nstates = M.shape[0]
+    q = -M.diagonal().min()
+
+    # Use shift-invert mode to find the eigenvalues nearest zero.
+    # No eigenvalue of a rate matrix has a positive real part,
+    # so a small positive shift is never an eigenvalue.
+    sigma = 1e-8 * max(q, 1)
+    A = M.tocsc()
+    k = min(6, nstates - 2, max_k)
+    while True:
+        try:
+            w = scipy.sparse.linalg.eigs(A, k=k, sigma=sigma,
+                    maxiter=maxiter, tol=tol, return_eigenvectors=False)
+        except scipy.sparse.linalg.ArpackNoConvergence as e:
+            return e.eigenvalues, False
+        gap = _get_gap_from_eigenvalues(w)
+        if gap == 0:
+            return w, True
+        if gap > 0 and np.abs(w - sigma).max() >= np.sqrt(2 * q * gap) + sigma:
+            return w, True
+        if k >= min(nstates - 2, max_k):
+            return w, False
+        k = min(2 * k, nstates - 2, max_k)
+
+
+def _get_factor_gap(Q, distn, states, maxiter, tol, dense_threshold, max_k):
+    M = get_sparse_rate_matrix(Q, states)
+    nstates = len(states)
+    reversible = _is_reversible(Q, distn, states)
+    if nstates < 2:
+        return SpectralGap(np.inf, 0.0, reversible, True)
+
+    # Symmetrize the rate matrix when detailed balance holds.
+    if reversible:
+        r = np.sqrt([distn[s] for s in states])
+        D = scipy.sparse.diags(r)
+        D_inv = scipy.sparse.diags(1 / r)
+        M = D.dot(M).dot(D_inv)
+        M = (M + M.T) / 2
+
+    # ARPACK needs more states than requested eigenvalues.
+    converged = True
+    if nstates <= max(dense_threshold, 3):
+        if reversible:
+            w = scipy.linalg.eigvalsh(M.toarray())
+        else:
+            w = scipy.linalg.eigvals(M.toarray())
+    elif reversible:
+        # The eigenvalues are real and not positive,
+        # so the two nearest a small positive shift are the largest.
+        sigma = 1e-8 * max(-M.diagonal().min(), 1)
+        try:
+            w = scipy.sparse.linalg.eigsh(M.tocsc(), k=2, sigma=sigma,
+                    maxiter=maxiter, tol=tol, return_eigenvectors=False)
+        except scipy.sparse.linalg.ArpackNoConvergence as e:
+            w = e.eigenvalues
+            converged = False
+    else:
+        w, converged = _get_nonreversible_eigenvalues(M, maxiter, tol, max_k)
+    gap = _get_gap_from_eigenvalues(w)
+    return SpectralGap(gap, 1 / gap if gap else np.inf, reversible, converged)
+
+
+def get_spectral_gap(Q, distn=None, states=None,
+        maxiter=None, tol=0, dense_threshold=64, max_k=256):
+    """
+    Estimate the spectral gap and relaxation time of a rate matrix.
+
+    If distn is provided and detailed balance holds, the rate matrix
+    is symmetrized by the equilibrium distribution and a symmetric
+    sparse eigensolver is used.  Otherwise a general sparse eigensolver
+    finds increasingly many eigenvalues nearest zero, until they
+    are known to include the eigenvalue with the least negative
+    real part.  Small rate matrices are handled with dense eigensolvers.
+
+    Parameters
+    ----------
+    Q : nx.DiGraph or ProductRateMatrix
+        rate matrix
+    distn : dict, optional
+        equilibrium distribution, or a sequence of factor equilibrium
+        distributions for a ProductRateMatrix
+    states : sequence, optional
+        states of the process, defaulting to the nodes of Q
+    maxiter : int, optional
+        iteration budget of the sparse eigensolver;
+        if the budget is exhausted the estimate is not converged
+    tol : float, optional
+        relative accuracy of the sparse eigensolver,
+        zero for machine precision
+    dense_threshold : int, optional
+        use dense eigensolvers for at most this many states
+    max_k : int, optional
+        largest number of eigenvalues requested from the sparse
+        eigensolver for a rate matrix without detailed balance
+
+    Returns
+    -------
+    estimate : SpectralGap
+        named tuple with fields gap, relaxation_time, reversible
+        and converged; the estimate is not converged if the iteration
+        budget was exhausted, or if max_k eigenvalues were not enough
+        to certify the gap, in which case the gap is an upper bound;
+        the gap is nan if not enough eigenvalues were found
+
+    """
+    if isinstance(Q, ProductRateMatrix):
+        # Eigenvalues of a Kronecker sum are sums of factor eigenvalues,
+        # so the gap of the product is the smallest factor gap.
+        if states is not None:
+            raise Exception('the states of a product rate matrix '
+                    'are defined by its factor states')
+        distns = distn
+        if distns is None:
+            distns = [None] * len(Q.Qs)
+        if isinstance(distns, dict) or len(distns) != len(Q.Qs):
+            raise Exception('expected a sequence of one distribution '
+                    'per factor')
+        estimates = [_get_factor_gap(q, d, factor_states, maxiter, tol,
+            dense_threshold, max_k) for q, d, factor_states in zip(
+                Q.Qs, distns, Q.factor_states)]
+        gap = min(e.gap for e in estimates)
+        return SpectralGap(gap, 1 / gap if gap else np.inf,
+                all(e.reversible for e in estimates),
+                all(e.converged for e in estimates))
+    if states is None:
+        states = list(Q)
+        if distn is not None:
+            states.extend(s for s in distn if s not in Q)
+    return _get_factor_gap(Q, distn, list(states), maxiter, tol,
+            dense_threshold, max_k)
+
+
+def get_relaxation_time(Q, distn=None, **kwargs):
+    """
+    Estimate the relaxation time of a rate matrix.
+
+    After several relaxation times, transition probabilities are close
+    to the equilibrium distribution, regardless of the initial state.
+    Keyword arguments are passed to get_spectral_gap.
+
+    """
+    return get_spectral_gap(Q, distn, **kwargs).relaxation_time
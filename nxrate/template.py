@@ -0,0 +1,184 @@
+"""
+Parameterized rate matrix templates with a fixed sparsity pattern.
+
+Each edge rate is a linear combination of parameters,
+or the exponential of a linear combination for log-linear templates.
+Rates for a whole batch of parameter vectors are computed by a single
+matrix product, and the validity of the rate matrix is checked once
+for the template rather than once for each parameter vector.
+
+Glossary of naming conventions in this module.
+    Q : rate matrix as an nx.DiGraph
+    X : (nnz, nparams) array of edge coefficients
+    theta : (nparams,) parameter vector or (batch, nparams) array
+    rates : (nnz,) edge rates or (batch, nnz) array
+
+"""
+from __future__ import division, print_function, absolute_import
+
+import networkx as nx
+import numpy as np
+
+__all__ = ['RateMatrixTemplate']
+
+
+class RateMatrixTemplate(object):
+    """
+    Map parameter vectors to the rates of a fixed set of edges.
+
+    Parameters
+    ----------
+    edges : sequence of pairs
+        ordered directed edges (sa, sb) of the rate matrix
+    X : array_like
+        (nnz, nparams) coefficients of the parameters for each edge
+    offsets : array_like, optional
+        (nnz,) constant terms for each edge, zero by default
+    log_linear : bool, optional
+        if True, each rate is exp(X theta + offsets),
+        otherwise each rate is X theta + offsets
+
+    Notes
+    -----
+    Log-linear rates are always positive.
+    Linear rates are non-negative for all non-negative parameter vectors
+    because the coefficients and offsets of a linear template
+    are required to be non-negative.
+
+    """
+    def __init__(self, edges, X, offsets=None, log_linear=False):
+        self.edges = [tuple(edge) for edge in edges]
+        self.X = np.array(X, dtype=float, ndmin=2)
+        nnz = len(self.edges)
+        if offsets is None:
+            offsets = np.zeros(nnz)
+        self.offsets = np.array(offsets, dtype=float)
+        self.log_linear = log_linear
+        if self.X.shape[0] != nnz:
+            raise Exception('expected %d rows of coefficients '
+                    'but found %d' % (nnz, self.X.shape[0]))
+        if self.offsets.shape != (nnz,):
+            raise Exception('expected one offset per edge')
+        self.nnz = nnz
+        self.nparams = self.X.shape[1]
+
+        # Check the sparsity pattern.
+        for sa, sb in self.edges:
+            if sa == sb:
+                raise Exception('self-transitions are not allowed '
+                        'in this networkx representation of rate matrices')
+        if len(set(self.edges)) != nnz:
+            raise Exception('each edge should appear only once')
+
+        # Check that linear rates are non-negative.
+        if not log_linear:
+            if np.any(self.X < 0):
+                raise Exception('the coefficients of a linear template '
+                        'must be non-negative')
+            if np.any(self.offsets < 0):
+                raise Exception('the offsets of a linear template '
+                        'must be non-negative')
+
+        # Index the states for batched exit rates.
+        self.states = []
+        s_to_i = {}
+        for edge in self.edges:
+            for s in edge:
+                if s not in s_to_i:
+                    s_to_i[s] = len(self.states)
+                    self.states.append(s)
+        self._src = np.array([s_to_i[sa] for sa, sb in self.edges], dtype=int)
+
+    @classmethod
+    def from_edge_coefficients(cls, edge_to_coeffs, nparams,
+            edge_to_offset=None, log_linear=False):
+        """
+        Build a template from sparse per-edge coefficients.
+
+        Parameters
+        ----------
+        edge_to_coeffs : dict
+            maps each edge (sa, sb) to a dict from parameter index
+            to coefficient
+        nparams : int
+            number of parameters
+        edge_to_offset : dict, optional
+            maps edges to constant terms, missing edges have offset zero
+        log_linear : bool, optional
+            see the class documentation
+
+        """
+        edges = list(edge_to_coeffs)
+        X = np.zeros((len(edges), nparams))
+        for i, edge in enumerate(edges):
+            for j, coeff in edge_to_coeffs[edge].items():
+                X[i, j] = coeff
+        offsets = None
+        if edge_to_offset is not None:
+            offsets = [edge_to_offset.get(edge, 0) for edge in edges]
+        return cls(edges, X, offsets=offsets, log_linear=log_linear)
+
+    def evaluate(self, theta):
+        """
+        Compute the edge rates for one or more parameter vectors.
+
+        Parameters
+        ----------
+        theta : array_like
+            (nparams,) parameter vector or (batch, nparams) array
+
+        Returns
+        -------
+        rates : ndarray
+            (nnz,) or (batch, nnz) rates aligned with the template edges
+
+        """
+        theta = np.asarray(theta, dtype=float)
+        if theta.shape[-1] != self.nparams:
+            raise Exception('expected %d parameters but found %d' % (
+                self.nparams, theta.shape[-1]))
+        if not self.log_linear and np.any(theta < 0):
+            raise Exception('the parameters of a linear template '
+                    'must be non-negative')
+        rates = theta.dot(self.X.T) + self.offsets
+        if self.log_linear:
+            rates = np.exp(rates)
+        return rates
+
+    def get_exit_rates(self, rates):
+        """
+        Compute the total rate out of each state.
+
+        Parameters
+        ----------
+        rates : array_like
+            (nnz,) or (batch, nnz) rates aligned with the template edges
+
+        Returns
+        -------
+        exit_rates : ndarray
+            (nstates,) or (batch, nstates) exit rates
+            aligned with the template states
+
+        """
+        rates = np.asarray(rates, dtype=float)
+        exit_rates = np.zeros(rates.shape[:-1] + (len(self.states),))
+        np.add.at(exit_rates, (Ellipsis, self._src), rates)
+        return exit_rates
+
+    def get_rate_matrix(self, rates):
+        """
+        Build an nx.DiGraph rate matrix from a single (nnz,) rate vector.
+
+        Edges with zero rate are omitted.
+
+        """
+        rates = np.asarray(rates, dtype=float)
+        if rates.shape != (self.nnz,):
+            raise Exception('expected a single vector of %d rates' % self.nnz)
+        Q = nx.DiGraph()
+        Q.add_nodes_from(self.states)
+        for (sa, sb), rate in zip(self.edges, rates.tolist()):
+            if rate:
+                Q.add_edge(sa, sb, weight=rate)
+        return Q
@@ -24,15 +24,26 @@ __all__ = [
         'assert_equilibrium', 'assert_detailed_balance',
         ]
 
-class DistnError(Exception): pass
+class CheckError(Exception):
+    """
+    Base class for failed checks, recording the offending states.
+
+    """
+    def __init__(self, msg, states=()):
+        Exception.__init__(self, msg)
+        self.states = list(states)
+
+class RateMatrixError(CheckError): pass
+
+class DistnError(CheckError): pass
 class LocalDistnError(DistnError): pass
 class GlobalDistnError(DistnError): pass
 
-class EquilibriumError(Exception): pass
+class EquilibriumError(CheckError): pass
 class UnweightedEquilibriumError(EquilibriumError): pass
 class WeightedEquilibriumError(EquilibriumError): pass
 
-class DetailedBalanceError(Exception): pass
+class DetailedBalanceError(CheckError): pass
 class UnweightedDetailedBalanceError(DetailedBalanceError): pass
 class WeightedDetailedBalanceError(DetailedBalanceError): pass
 
@@ -51,14 +62,14 @@ def assert_distn(d):
     min_v = d[min_k]
     if min_v < 0:
         raise LocalDistnError('probabilities must be non-negative, '
-                'but found prob(%s) : %f' % (min_k, min_v))
+                'but found prob(%s) : %f' % (min_k, min_v), [min_k])
 
     # Check for probabilities that are too large.
     max_k = dict_argmax(d)
     max_v = d[max_k]
     if max_v > 1:
         raise LocalDistnError('probabilities must not be greater than 1, '
-                'but found prob(%s) : %f' % (max_k, max_v))
+                'but found prob(%s) : %f' % (max_k, max_v), [max_k])
 
     # Check that the sum of probabilities is nearly 1.
     total = sum(d.values())
@@ -74,12 +85,13 @@ def assert_nxdistn(nxdistn):
 def assert_rate_matrix(Q):
     for sa, sb in Q.edges():
         if sa == sb:
-            raise Exception('self-transitions are not allowed '
-                    'in this networkx representation of rate matrices')
+            raise RateMatrixError('self-transitions are not allowed '
+                    'in this networkx representation of rate matrices',
+                    [sa])
         rate = Q[sa][sb]['weight']
         if rate < 0:
-            raise Exception('negative rate '
-                    'from %s to %s: %f' % (sa, sb, rate))
+            raise RateMatrixError('negative rate '
+                    'from %s to %s: %f' % (sa, sb, rate), [sa, sb])
 
 
 def assert_equilibrium(Q, distn, check_inputs=True):
@@ -102,13 +114,13 @@ def assert_equilibrium(Q, distn, check_inputs=True):
     imba = set(flow_out) - set(flow_in)
     if imba:
         raise UnweightedEquilibriumError('the following states have flow out '
-                'but not in: %s' % str(imba))
+                'but not in: %s' % str(imba), imba)
 
     # Check that each state with flow in also has flow out.
     imba = set(flow_in) - set(flow_out)
     if imba:
         raise UnweightedEquilibriumError('the following states have flow in '
-                'but not out: %s' % str(imba))
+                'but not out: %s' % str(imba), imba)
 
     # Check that the net flow out of each vertex is negligible.
     states = set(flow_in) & set(flow_out)
@@ -116,7 +128,7 @@ def assert_equilibrium(Q, distn, check_inputs=True):
         if not isclose(flow_in[s], flow_out[s]):
             raise WeightedEquilibriumError('equilibrium fails for state %s: '
                     'flow in: %f  flow out: %f' % (
-                        s, flow_in[s], flow_out[s]))
+                        s, flow_in[s], flow_out[s]), [s])
 
 
 def assert_detailed_balance(Q, distn, check_inputs=True):
@@ -135,7 +147,7 @@ def assert_detailed_balance(Q, distn, check_inputs=True):
     if imba:
         raise UnweightedDetailedBalanceError('detailed balance fails '
                 'because only the forward direction of flow exists '
-                'for the following state pairs: %s' % str(imba))
+                'for the following state pairs: %s' % str(imba), imba)
 
     # Check that flow quantity is symmetric between vertex pairs.
     for sa, sb in edges_ab:
@@ -145,5 +157,5 @@ def assert_detailed_balance(Q, distn, check_inputs=True):
             raise WeightedDetailedBalanceError('detailed balance fails '
                     'for state pair (%s, %s): '
                     'forward flow: %f  backward flow: %f' % (
-                        sa, sb, flow_ab, flow_ba))
+                        sa, sb, flow_ab, flow_ba), [sa, sb])
 
@@ -0,0 +1,125 @@
+"""
+"""
+from __future__ import division, print_function, absolute_import
+
+import networkx as nx
+import numpy as np
+from numpy.testing import assert_raises, assert_equal, assert_allclose
+
+import nxrate
+from nxrate import compact
+from nxrate.compact import CompactRateMatrix, get_index_dtype
+from nxrate.util import (
+        isclose,
+        get_uniform_distn,
+        get_random_binom_distn,
+        get_random_symmetric_dense_Q,
+        get_random_sparse_uniform_distn,
+        )
+from nxrate.testing import (
+        RateMatrixError, LocalDistnError, GlobalDistnError,
+        UnweightedDetailedBalanceError, WeightedDetailedBalanceError,
+        UnweightedEquilibriumError, WeightedEquilibriumError,
+        )
+
+
+def test_index_dtype():
+    assert_equal(get_index_dtype(1), np.int16)
+    assert_equal(get_index_dtype(2**15), np.int16)
+    assert_equal(get_index_dtype(2**15 + 1), np.int32)
+    assert_equal(get_index_dtype(2**31 + 1), np.int64)
+
+
+def test_isclose_dtype():
+    x = 1 / 3
+    y = float(np.float32(x))
+    assert not isclose(y, x, rtol=1e-9, atol=0)
+    assert isclose(y, x, rtol=1e-9, atol=0, dtype=np.float32)
+    assert not isclose(1.001, 1, dtype=np.float32)
+
+
+def test_compact_storage():
+    np.random.seed(1234)
+    Q = get_random_symmetric_dense_Q(range(5))
+    cQ = CompactRateMatrix(Q)
+    assert_equal(cQ.row.dtype, np.int16)
+    assert_equal(cQ.rates.dtype, np.float32)
+    assert_equal(cQ.nbytes, 20 * (2 + 2 + 4))
+    R = cQ.to_nx()
+    assert_equal(set(R.edges()), set(Q.edges()))
+    for sa, sb in Q.edges():
+        assert_allclose(R[sa][sb]['weight'], Q[sa][sb]['weight'], rtol=1e-6)
+    exit_rates = cQ.get_exit_rates()
+    assert_equal(exit_rates.dtype, np.float64)
+    for i, s in enumerate(cQ.states):
+        expected = sum(Q[s][sb]['weight'] for sb in Q.successors(s))
+        assert_allclose(exit_rates[i], expected, rtol=1e-6)
+
+
+def test_compact_ok():
+    np.random.seed(1234)
+    for states in range(2), list('abcd'), range(50):
+        Q = get_random_symmetric_dense_Q(states)
+        cQ = CompactRateMatrix(Q)
+        p = cQ.get_distn_array(get_uniform_distn(states))
+        for check_inputs in False, True:
+            compact.assert_equilibrium(cQ, p, check_inputs=check_inputs)
+            compact.assert_detailed_balance(cQ, p, check_inputs=check_inputs)
+
+
+def test_compact_bad_distn():
+    np.random.seed(1234)
+    for states in range(3), list('abcd'):
+        Q = get_random_symmetric_dense_Q(states)
+        cQ = CompactRateMatrix(Q)
+        p = cQ.get_distn_array(get_random_binom_distn(states))
+        assert_raises(WeightedEquilibriumError,
+                compact.assert_equilibrium, cQ, p)
+        assert_raises(WeightedDetailedBalanceError,
+                compact.assert_detailed_balance, cQ, p)
+
+
+def test_compact_sparse_distn():
+    for states in list('abc'), list('ab'):
+        Q = get_random_symmetric_dense_Q(states)
+        cQ = CompactRateMatrix(Q)
+        p = cQ.get_distn_array(get_random_sparse_uniform_distn(states))
+        assert_raises(UnweightedEquilibriumError,
+                compact.assert_equilibrium, cQ, p)
+        assert_raises(UnweightedDetailedBalanceError,
+                compact.assert_detailed_balance, cQ, p)
+
+
+def test_compact_equilibrium_but_not_detailed_balance():
+    states = list('abcd')
+    Q = nx.DiGraph()
+    Q.add_weighted_edges_from([
+        ('a', 'b', 2),
+        ('b', 'c', 2),
+        ('c', 'd', 2),
+        ('d', 'a', 2),
+        ])
+    cQ = CompactRateMatrix(Q)
+    p = cQ.get_distn_array(get_uniform_distn(states))
+    compact.assert_equilibrium(cQ, p)
+    try:
+        compact.assert_detailed_balance(cQ, p)
+    except UnweightedDetailedBalanceError as e:
+        assert_equal(len(e.states), 4)
+    else:
+        raise AssertionError('expected a detailed balance error')
+
+
+def test_compact_bad_inputs():
+    Q = nx.DiGraph()
+    Q.add_weighted_edges_from([('a', 'b', 1), ('b', 'a', -1)])
+    cQ = CompactRateMatrix(Q)
+    assert_raises(RateMatrixError, compact.assert_rate_matrix, cQ)
+    Q = nx.DiGraph()
+    Q.add_weighted_edges_from([('a', 'b', 1), ('a', 'a', 1)])
+    cQ = CompactRateMatrix(Q)
+    assert_raises(RateMatrixError, compact.assert_rate_matrix, cQ)
+    p = np.array([0.5, 0.6], dtype=np.float32)
+    assert_raises(GlobalDistnError, compact.assert_distn, p)
+    p = np.array([-0.5, 1.5], dtype=np.float32)
+    assert_raises(LocalDistnError, compact.assert_distn, p)
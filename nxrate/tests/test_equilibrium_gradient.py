@@ -0,0 +1,69 @@
+"""
+"""
+from __future__ import division, print_function, absolute_import
+
+import networkx as nx
+import numpy as np
+from numpy.testing import assert_allclose, assert_equal
+
+import nxrate
+from nxrate.equilibrium import get_equilibrium_distn, get_equilibrium_gradient
+from nxrate.testing import assert_equilibrium
+
+
+def _get_Q():
+    Q = nx.DiGraph()
+    Q.add_weighted_edges_from([
+        ('a', 'b', 1),
+        ('b', 'c', 2),
+        ('c', 'a', 3),
+        ('a', 'c', 0.5),
+        ('c', 'd', 1.5),
+        ('d', 'b', 0.7),
+        ('b', 'a', 0.2),
+        ])
+    return Q
+
+
+def _objective(distn):
+    coeffs = {'a' : 1, 'b' : -2, 'c' : 0.5, 'd' : 3}
+    return sum(coeffs[s] * p * p for s, p in distn.items())
+
+
+def _objective_gradient(distn):
+    coeffs = {'a' : 1, 'b' : -2, 'c' : 0.5, 'd' : 3}
+    return dict((s, 2 * coeffs[s] * p) for s, p in distn.items())
+
+
+def test_gradient_finite_differences():
+    Q = _get_Q()
+    distn, edge_gradient = get_equilibrium_gradient(Q, _objective_gradient)
+    assert_equilibrium(Q, distn)
+    edges = list(Q.edges())
+    assert_equal(edge_gradient.shape, (len(edges),))
+    h = 1e-6
+    for (sa, sb), d in zip(edges, edge_gradient):
+        values = []
+        for delta in h, -h:
+            R = Q.copy()
+            R[sa][sb]['weight'] += delta
+            values.append(_objective(get_equilibrium_distn(R)))
+        assert_allclose(d, (values[0] - values[1]) / (2 * h), rtol=1e-5)
+
+
+def test_gradient_of_probability():
+    # The objective is the equilibrium probability of a single state.
+    Q = _get_Q()
+    distn, edge_gradient = get_equilibrium_gradient(Q, {'d' : 1})
+    # Scaling all rates leaves the equilibrium unchanged.
+    rates = np.array([Q[sa][sb]['weight'] for sa, sb in Q.edges()])
+    assert_allclose(rates.dot(edge_gradient), 0, atol=1e-12)
+    assert_allclose(distn['d'], get_equilibrium_distn(Q)['d'])
+
+
+def test_gradient_single_state():
+    Q = nx.DiGraph()
+    Q.add_node('a')
+    distn, edge_gradient = get_equilibrium_gradient(Q, {'a' : 1})
+    assert_equal(distn, {'a' : 1.0})
+    assert_equal(edge_gradient.shape, (0,))
@@ -0,0 +1,105 @@
+"""
+"""
+from __future__ import division, print_function, absolute_import
+
+from itertools import product
+
+import networkx as nx
+from numpy.testing import assert_allclose, assert_equal
+
+import nxrate
+from nxrate.equilibrium import get_equilibrium_distn
+from nxrate.lumping import (
+        get_coarsest_lumping, get_lumped_rate_matrix, lift_distn)
+from nxrate.testing import assert_equilibrium, assert_rate_matrix
+
+
+def _get_sites_Q(nsites, a, b):
+    # Independent identical two-state sites,
+    # with rate a from 0 to 1 and rate b from 1 to 0.
+    Q = nx.DiGraph()
+    for state in product((0, 1), repeat=nsites):
+        for i in range(nsites):
+            other = state[:i] + (1 - state[i],) + state[i+1:]
+            rate = b if state[i] else a
+            Q.add_edge(state, other, weight=rate)
+    return Q
+
+
+def _get_block_sets(state_to_block):
+    d = {}
+    for s, b in state_to_block.items():
+        d.setdefault(b, set()).add(s)
+    return set(frozenset(v) for v in d.values())
+
+
+def test_sites_lumping():
+    nsites, a, b = 3, 0.3, 1.7
+    Q = _get_sites_Q(nsites, a, b)
+    state_to_block = get_coarsest_lumping(Q)
+    expected = {}
+    for s in Q:
+        expected.setdefault(sum(s), set()).add(s)
+    assert_equal(_get_block_sets(state_to_block),
+            set(frozenset(v) for v in expected.values()))
+
+    # Check the lumped rates, which are those of a birth-death process.
+    lumped_Q = get_lumped_rate_matrix(Q, state_to_block)
+    assert_rate_matrix(lumped_Q)
+    assert_equal(lumped_Q.number_of_nodes(), nsites + 1)
+    for k in range(nsites):
+        bk = state_to_block[(1,) * k + (0,) * (nsites - k)]
+        bl = state_to_block[(1,) * (k + 1) + (0,) * (nsites - k - 1)]
+        assert_allclose(lumped_Q[bk][bl]['weight'], (nsites - k) * a)
+        assert_allclose(lumped_Q[bl][bk]['weight'], (k + 1) * b)
+
+
+def test_lift_lumped_equilibrium():
+    Q = _get_sites_Q(4, 0.3, 1.7)
+    state_to_block = get_coarsest_lumping(Q)
+    lumped_Q = get_lumped_rate_matrix(Q, state_to_block)
+    lumped_distn = get_equilibrium_distn(lumped_Q)
+    distn = lift_distn(lumped_distn, state_to_block)
+    assert_equilibrium(Q, distn)
+    expected = get_equilibrium_distn(Q)
+    for s, p in expected.items():
+        assert_allclose(distn[s], p)
+
+
+def test_initial_partition():
+    Q = _get_sites_Q(3, 0.3, 1.7)
+    partition = dict((s, s[0]) for s in Q)
+    state_to_block = get_coarsest_lumping(Q, partition)
+    assert_equal(len(set(state_to_block.values())), 6)
+    for sa, sb in product(Q, repeat=2):
+        if state_to_block[sa] == state_to_block[sb]:
+            assert_equal(sa[0], sb[0])
+            assert_equal(sum(sa), sum(sb))
+
+
+def test_strong_lumping():
+    # Only the number of ones among the last two sites is observed.
+    Q = _get_sites_Q(3, 0.3, 1.7)
+    partition = dict((s, sum(s[1:])) for s in Q)
+    state_to_block = get_coarsest_lumping(Q, partition, exact=False)
+    assert_equal(len(set(state_to_block.values())), 3)
+    state_to_block = get_coarsest_lumping(Q, exact=False)
+    assert_equal(len(set(state_to_block.values())), 1)
+
+
+def test_no_lumping():
+    Q = nx.DiGraph()
+    Q.add_weighted_edges_from([
+        ('a', 'b', 1),
+        ('b', 'c', 2),
+        ('c', 'a', 3),
+        ])
+    state_to_block = get_coarsest_lumping(Q)
+    assert_equal(len(set(state_to_block.values())), 3)
+
+
+def test_lift_weights():
+    state_to_block = {'a' : 0, 'b' : 0, 'c' : 1}
+    distn = lift_distn({0 : 0.5, 1 : 0.5}, state_to_block,
+            weights={'a' : 1, 'b' : 3, 'c' : 1})
+    assert_allclose([distn['a'], distn['b'], distn['c']], [0.125, 0.375, 0.5])
@@ -0,0 +1,113 @@
+"""
+"""
+from __future__ import division, print_function, absolute_import
+
+from itertools import product
+
+import networkx as nx
+import numpy as np
+from numpy.testing import assert_raises, assert_allclose, assert_equal
+
+import nxrate
+from nxrate.util import (
+        get_uniform_distn,
+        get_random_binom_distn,
+        get_random_symmetric_dense_Q,
+        )
+from nxrate.equilibrium import get_equilibrium_distn
+from nxrate.product import ProductRateMatrix
+from nxrate.testing import (
+        assert_equilibrium,
+        WeightedEquilibriumError, UnweightedDetailedBalanceError,
+        )
+
+
+def _get_cycle_Q():
+    Q = nx.DiGraph()
+    Q.add_weighted_edges_from([
+        ('a', 'b', 1),
+        ('b', 'c', 2),
+        ('c', 'a', 3),
+        ('a', 'c', 0.5),
+        ])
+    return Q
+
+
+def _get_explicit_product_Q(Qs):
+    # Build the product chain the expensive way, for comparison.
+    factor_states = [list(Q) for Q in Qs]
+    P = nx.DiGraph()
+    for state in product(*factor_states):
+        for i, Q in enumerate(Qs):
+            for sb in Q.successors(state[i]):
+                other = state[:i] + (sb,) + state[i+1:]
+                P.add_edge(state, other, weight=Q[state[i]][sb]['weight'])
+    return P
+
+
+def _get_dense(Q, states):
+    s_to_i = dict((s, i) for i, s in enumerate(states))
+    M = np.zeros((len(states), len(states)))
+    for sa, sb in Q.edges():
+        M[s_to_i[sa], s_to_i[sb]] = Q[sa][sb]['weight']
+    M -= np.diag(M.sum(axis=1))
+    return M
+
+
+def test_product_matvec():
+    np.random.seed(1234)
+    Qs = [_get_cycle_Q(), get_random_symmetric_dense_Q(range(4))]
+    prod_Q = ProductRateMatrix(Qs)
+    M = _get_dense(_get_explicit_product_Q(Qs), list(prod_Q.states()))
+    v = np.random.randn(prod_Q.nstates)
+    assert_allclose(prod_Q.dot(v), M.dot(v))
+    assert_allclose(prod_Q.rdot(v), v.dot(M))
+    V = np.random.randn(prod_Q.nstates, 3)
+    assert_allclose(prod_Q.dot(V), M.dot(V))
+
+
+def test_product_state_indices():
+    prod_Q = ProductRateMatrix([_get_cycle_Q(), _get_cycle_Q()])
+    for i, state in enumerate(prod_Q.states()):
+        assert_equal(prod_Q.state_to_index(state), i)
+        assert prod_Q.index_to_state(i) == state
+
+
+def test_product_equilibrium():
+    Qs = [_get_cycle_Q(), _get_cycle_Q(), get_random_symmetric_dense_Q('xy')]
+    prod_Q = ProductRateMatrix(Qs)
+    p = prod_Q.get_equilibrium_array()
+    assert_allclose(p.sum(), 1)
+    assert_allclose(prod_Q.rdot(p), 0, atol=1e-12)
+    distn = prod_Q.get_equilibrium_distn()
+    P = _get_explicit_product_Q(Qs)
+    assert_equilibrium(P, distn)
+    expected = get_equilibrium_distn(P)
+    for state, value in expected.items():
+        assert_allclose(distn[state], value)
+
+
+def test_product_factor_checks_ok():
+    states = list('abc')
+    Qs = [get_random_symmetric_dense_Q(states) for i in range(3)]
+    distns = [get_uniform_distn(states) for i in range(3)]
+    prod_Q = ProductRateMatrix(Qs)
+    prod_Q.assert_equilibrium(distns)
+    prod_Q.assert_detailed_balance(distns)
+
+
+def test_product_factor_checks_bad():
+    np.random.seed(1234)
+    states = list('abc')
+    sym_Q = get_random_symmetric_dense_Q(states)
+    prod_Q = ProductRateMatrix([sym_Q, _get_cycle_Q()])
+    distns = [get_random_binom_distn(states), get_uniform_distn(states)]
+    assert_raises(WeightedEquilibriumError, prod_Q.assert_equilibrium, distns)
+    distns = prod_Q.get_factor_equilibrium_distns()
+    prod_Q.assert_equilibrium(distns)
+    assert_raises(UnweightedDetailedBalanceError,
+            prod_Q.assert_detailed_balance, distns)
+
+
+def test_product_no_factors():
+    assert_raises(Exception, ProductRateMatrix, [])
@@ -0,0 +1,146 @@
+"""
+"""
+from __future__ import division, print_function, absolute_import
+
+from itertools import product
+
+import networkx as nx
+import numpy as np
+import scipy.linalg
+from numpy.testing import assert_allclose, assert_equal, assert_raises
+
+import nxrate
+from nxrate.equilibrium import get_equilibrium_distn
+from nxrate.pruning import PruningEngine
+from nxrate.util import (
+        get_uniform_distn, get_random_symmetric_dense_Q,
+        get_sparse_rate_matrix)
+
+
+def _get_tree():
+    T = nx.DiGraph()
+    T.add_weighted_edges_from([
+        ('r', 'x', 0.3),
+        ('r', 'c', 0.7),
+        ('x', 'a', 0.2),
+        ('x', 'b', 1.1),
+        ])
+    return T
+
+
+def _get_cycle_Q():
+    Q = nx.DiGraph()
+    Q.add_weighted_edges_from([
+        (0, 1, 1),
+        (1, 2, 2),
+        (2, 0, 3),
+        (0, 2, 0.5),
+        ])
+    return Q
+
+
+def _get_brute_force_log_likelihood(T, Q, distn, leaves, states, column):
+    M = get_sparse_rate_matrix(Q, states).toarray()
+    prior = np.array([distn.get(s, 0) for s in states])
+    edge_to_P = dict(((na, nb), scipy.linalg.expm(M * T[na][nb]['weight']))
+            for na, nb in T.edges())
+    internal = [v for v in T if v not in leaves]
+    total = 0
+    for assignment in product(range(len(states)), repeat=len(internal)):
+        node_to_i = dict(zip(internal, assignment))
+        node_to_i.update(zip(leaves, column))
+        p = prior[node_to_i['r']]
+        for na, nb in T.edges():
+            p *= edge_to_P[na, nb][node_to_i[na], node_to_i[nb]]
+        total += p
+    return np.log(total)
+
+
+def _check_brute_force(Q, distn):
+    T = _get_tree()
+    engine = PruningEngine(T, Q, distn)
+    leaves = engine.leaves
+    nstates = len(engine.states)
+    data = np.array(list(product(range(nstates), repeat=len(leaves))))
+    data = np.vstack([data, data[::-1]])
+    lls = engine.get_log_likelihoods(data)
+    assert_equal(lls.shape, (len(data),))
+    for column, ll in zip(data, lls):
+        expected = _get_brute_force_log_likelihood(
+                T, Q, distn, leaves, engine.states, column)
+        assert_allclose(ll, expected)
+
+    # The likelihoods of all possible columns add up to one.
+    assert_allclose(np.exp(lls[:len(data) // 2]).sum(), 1)
+    assert_allclose(engine.get_log_likelihood(data), lls.sum())
+
+
+def test_reversible_brute_force():
+    np.random.seed(1234)
+    states = range(3)
+    Q = get_random_symmetric_dense_Q(states)
+    engine = PruningEngine(_get_tree(), Q, get_uniform_distn(states))
+    assert engine.reversible
+    _check_brute_force(Q, get_uniform_distn(states))
+
+
+def test_nonreversible_brute_force():
+    Q = _get_cycle_Q()
+    distn = get_equilibrium_distn(Q)
+    engine = PruningEngine(_get_tree(), Q, distn)
+    assert not engine.reversible
+    _check_brute_force(Q, distn)
+
+
+def test_missing_data():
+    np.random.seed(1234)
+    states = range(4)
+    Q = get_random_symmetric_dense_Q(states)
+    distn = get_uniform_distn(states)
+    engine = PruningEngine(_get_tree(), Q, distn, leaves=['a', 'b', 'c'])
+    lls = engine.get_log_likelihoods([[-1, -1, -1], [2, -1, -1]])
+    assert_allclose(lls, [0, np.log(0.25)], atol=1e-12)
+
+
+def test_saturated_branch():
+    np.random.seed(1234)
+    states = range(4)
+    Q = get_random_symmetric_dense_Q(states)
+    distn = get_uniform_distn(states)
+    T = nx.DiGraph()
+    T.add_weighted_edges_from([('r', 'a', 1e-3), ('r', 'b', 1e4)])
+    engine = PruningEngine(T, Q, distn)
+    assert_allclose(engine.edge_to_P['r', 'b'], np.full((4, 4), 0.25))
+    assert_allclose(engine.edge_to_P['r', 'a'].sum(axis=1), np.ones(4))
+
+
+def test_underflow_rescaling():
+    # A star tree with many leaves has column likelihoods
+    # far below the smallest positive double.
+    np.random.seed(1234)
+    states = range(4)
+    Q = get_random_symmetric_dense_Q(states)
+    distn = get_uniform_distn(states)
+    nleaves = 2000
+    T = nx.DiGraph()
+    T.add_edge('r', 'x', weight=0.1)
+    for i in range(nleaves):
+        T.add_edge('x', i, weight=0.5)
+    engine = PruningEngine(T, Q, distn, leaves=range(nleaves))
+    data = np.random.randint(4, size=(3, nleaves))
+    lls = engine.get_log_likelihoods(data)
+    assert np.all(np.isfinite(lls))
+    assert np.all(lls < np.log(np.finfo(float).tiny))
+
+
+def test_bad_inputs():
+    Q = _get_cycle_Q()
+    distn = get_uniform_distn(range(3))
+    assert_raises(Exception, PruningEngine, _get_tree(), Q, distn)
+    distn = get_equilibrium_distn(Q)
+    engine = PruningEngine(_get_tree(), Q, distn)
+    assert_raises(Exception, engine.get_log_likelihoods, [[0, 1]])
+    assert_raises(Exception, engine.get_log_likelihoods, [[0, 1, 3]])
+    T = _get_tree()
+    T.add_edge('c', 'a', weight=1)
+    assert_raises(Exception, PruningEngine, T, Q, distn)
@@ -0,0 +1,140 @@
+"""
+"""
+from __future__ import division, print_function, absolute_import
+
+import networkx as nx
+import numpy as np
+from numpy.testing import assert_allclose, assert_equal, assert_raises
+
+import nxrate
+from nxrate.util import (
+        get_uniform_distn, get_random_symmetric_dense_Q,
+        get_sparse_rate_matrix)
+from nxrate.product import ProductRateMatrix
+from nxrate.spectral import get_spectral_gap, get_relaxation_time
+
+
+def _get_cycle_Q(nstates, rate):
+    Q = nx.DiGraph()
+    for i in range(nstates):
+        Q.add_edge(i, (i + 1) % nstates, weight=rate)
+    return Q
+
+
+def _get_path_Q(nstates, rate):
+    Q = nx.DiGraph()
+    for i in range(nstates - 1):
+        Q.add_edge(i, i + 1, weight=rate)
+        Q.add_edge(i + 1, i, weight=rate)
+    return Q
+
+
+def _get_dense_gap(Q):
+    w = np.linalg.eigvals(get_sparse_rate_matrix(Q, list(Q)).toarray())
+    return -np.sort(w.real)[-2]
+
+
+def test_reversible_sparse_gap():
+    # A symmetric random walk on a path has a known spectral gap.
+    n, rate = 200, 1.5
+    Q = _get_path_Q(n, rate)
+    distn = get_uniform_distn(range(n))
+    expected = 2 * rate * (1 - np.cos(np.pi / n))
+    estimate = get_spectral_gap(Q, distn, dense_threshold=0)
+    assert estimate.reversible
+    assert estimate.converged
+    assert_allclose(estimate.gap, expected)
+    assert_allclose(estimate.relaxation_time, 1 / expected)
+
+
+def test_reversible_dense_gap():
+    np.random.seed(1234)
+    states = range(6)
+    Q = get_random_symmetric_dense_Q(states)
+    estimate = get_spectral_gap(Q, get_uniform_distn(states))
+    assert estimate.reversible
+    assert_allclose(estimate.gap, _get_dense_gap(Q))
+
+
+def test_nonreversible_sparse_gap():
+    n, rate = 100, 2.0
+    Q = _get_cycle_Q(n, rate)
+    distn = get_uniform_distn(range(n))
+    expected = rate * (1 - np.cos(2 * np.pi / n))
+    estimate = get_spectral_gap(Q, distn, dense_threshold=0)
+    assert not estimate.reversible
+    assert_allclose(estimate.gap, expected)
+    estimate = get_spectral_gap(Q, dense_threshold=0)
+    assert_allclose(estimate.gap, expected)
+
+
+def _get_cycle_with_path_Q(ncycle, cycle_rate):
+    # A fast cycle whose slowest mode has a large imaginary part,
+    # linked to a slow path with real modes of larger magnitude.
+    np.random.seed(1234)
+    Q = nx.DiGraph()
+    for i in range(ncycle):
+        Q.add_edge(('c', i), ('c', (i + 1) % ncycle), weight=cycle_rate)
+    for i in range(9):
+        Q.add_edge(('p', i), ('p', i + 1), weight=np.random.uniform(1, 3))
+        Q.add_edge(('p', i + 1), ('p', i), weight=np.random.uniform(1, 3))
+    Q.add_edge(('c', 0), ('p', 0), weight=np.random.uniform(1, 100))
+    Q.add_edge(('p', 0), ('c', 0), weight=np.random.uniform(1, 100))
+    return Q
+
+
+def test_nonreversible_complex_slowest_mode():
+    Q = _get_cycle_with_path_Q(500, 500.0)
+    estimate = get_spectral_gap(Q, dense_threshold=0)
+    assert estimate.converged
+    assert_allclose(estimate.gap, _get_dense_gap(Q), rtol=1e-6)
+
+    # Too few eigenvalues cannot certify the gap.
+    estimate = get_spectral_gap(Q, dense_threshold=0, max_k=2)
+    assert_equal(estimate.converged, False)
+    assert estimate.gap >= _get_dense_gap(Q)
+
+
+def test_tiny_chains_without_dense_threshold():
+    for nstates in 2, 3:
+        for Q in _get_cycle_Q(nstates, 2.0), _get_path_Q(nstates, 2.0):
+            distn = get_uniform_distn(range(nstates))
+            for d in None, distn:
+                estimate = get_spectral_gap(Q, d, dense_threshold=0)
+                assert estimate.converged
+                assert_allclose(estimate.gap, _get_dense_gap(Q))
+
+
+def test_product_gap():
+    Qs = [_get_cycle_Q(3, 1.0), _get_path_Q(4, 0.5)]
+    prod_Q = ProductRateMatrix(Qs)
+    expected = min(_get_dense_gap(Q) for Q in Qs)
+    assert_allclose(get_spectral_gap(prod_Q).gap, expected)
+    distns = prod_Q.get_factor_equilibrium_distns()
+    estimate = get_spectral_gap(prod_Q, distns)
+    assert_allclose(estimate.gap, expected)
+    assert not estimate.reversible
+    assert_raises(Exception, get_spectral_gap, prod_Q, distns[0])
+    assert_raises(Exception, get_spectral_gap, prod_Q, distns[:1])
+    assert_raises(Exception, get_spectral_gap, prod_Q,
+            states=prod_Q.factor_states[0])
+
+
+def test_iteration_budget():
+    Q = _get_cycle_with_path_Q(300, 300.0)
+    estimate = get_spectral_gap(Q, maxiter=1, dense_threshold=0)
+    assert_equal(estimate.converged, False)
+    estimate = get_spectral_gap(Q, dense_threshold=0)
+    assert_equal(estimate.converged, True)
+    assert_allclose(estimate.gap, _get_dense_gap(Q))
+
+
+def test_reducible_relaxation_time():
+    Q = nx.DiGraph()
+    Q.add_weighted_edges_from([
+        ('a', 'b', 1),
+        ('b', 'a', 1),
+        ('c', 'd', 1),
+        ('d', 'c', 1),
+        ])
+    assert_equal(get_relaxation_time(Q), np.inf)
@@ -0,0 +1,84 @@
+"""
+"""
+from __future__ import division, print_function, absolute_import
+
+import numpy as np
+from numpy.testing import assert_raises, assert_allclose, assert_equal
+
+import nxrate
+from nxrate.template import RateMatrixTemplate
+from nxrate.testing import assert_rate_matrix
+
+
+def _get_k80_template(log_linear=False):
+    # Kimura two-parameter pattern: transitions use the first parameter
+    # and transversions use the second parameter.
+    transitions = set([('A', 'G'), ('G', 'A'), ('C', 'T'), ('T', 'C')])
+    d = {}
+    for sa in 'ACGT':
+        for sb in 'ACGT':
+            if sa != sb:
+                j = 0 if (sa, sb) in transitions else 1
+                d[sa, sb] = {j : 1}
+    return RateMatrixTemplate.from_edge_coefficients(
+            d, 2, log_linear=log_linear)
+
+
+def test_linear_batch_evaluation():
+    template = _get_k80_template()
+    thetas = np.array([[2, 1], [0.5, 3], [1, 1]])
+    rates = template.evaluate(thetas)
+    assert_equal(rates.shape, (3, 12))
+    for theta, row in zip(thetas, rates):
+        assert_allclose(template.evaluate(theta), row)
+        Q = template.get_rate_matrix(row)
+        assert_rate_matrix(Q)
+        assert_allclose(Q['A']['G']['weight'], theta[0])
+        assert_allclose(Q['A']['C']['weight'], theta[1])
+
+
+def test_zero_rates_omitted():
+    template = _get_k80_template()
+    Q = template.get_rate_matrix(template.evaluate([0, 1]))
+    assert_equal(Q.number_of_nodes(), 4)
+    assert_equal(Q.number_of_edges(), 8)
+    assert not Q.has_edge('A', 'G')
+
+
+def test_log_linear_batch_evaluation():
+    template = _get_k80_template(log_linear=True)
+    thetas = np.array([[0, 0], [-1, 2]])
+    rates = template.evaluate(thetas)
+    assert_allclose(rates[0], np.ones(12))
+    assert_allclose(rates[1].min(), np.exp(-1))
+    assert_allclose(rates[1].max(), np.exp(2))
+
+
+def test_exit_rates():
+    template = _get_k80_template()
+    rates = template.evaluate([[2, 1], [1, 1]])
+    assert_allclose(template.get_exit_rates(rates), [[4] * 4, [3] * 4])
+
+
+def test_offsets():
+    template = RateMatrixTemplate(
+            [('a', 'b'), ('b', 'a')], [[1, 0], [0, 2]], offsets=[0.5, 0])
+    assert_allclose(template.evaluate([1, 1]), [1.5, 2])
+
+
+def test_bad_patterns():
+    assert_raises(Exception, RateMatrixTemplate,
+            [('a', 'a')], [[1]])
+    assert_raises(Exception, RateMatrixTemplate,
+            [('a', 'b'), ('a', 'b')], [[1], [1]])
+    assert_raises(Exception, RateMatrixTemplate,
+            [('a', 'b')], [[-1]])
+    assert_raises(Exception, RateMatrixTemplate,
+            [('a', 'b')], [[1]], offsets=[-1])
+    RateMatrixTemplate([('a', 'b')], [[-1]], log_linear=True)
+
+
+def test_bad_parameters():
+    template = _get_k80_template()
+    assert_raises(Exception, template.evaluate, [[1, -1]])
+    assert_raises(Exception, template.evaluate, [1, 2, 3])
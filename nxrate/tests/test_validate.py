@@ -0,0 +1,89 @@
+"""
+"""
+from __future__ import division, print_function, absolute_import
+
+import json
+import os
+import shutil
+import tempfile
+
+from numpy.testing import assert_equal
+
+import nxrate
+from nxrate.validate import (
+        load_model, validate_model, validate_models, get_model_filenames)
+
+
+def _get_models():
+    symmetric = [['a', 'b', 2], ['b', 'a', 2], ['b', 'c', 1], ['c', 'b', 1]]
+    cycle = [['a', 'b', 1], ['b', 'c', 1], ['c', 'a', 1]]
+    uniform = [['a', 1/3], ['b', 1/3], ['c', 1/3]]
+    return {
+            'ok.json' : {'Q' : symmetric, 'distn' : uniform},
+            'cycle.json' : {'Q' : cycle, 'distn' : uniform},
+            'bad.json' : {'Q' : symmetric,
+                'distn' : {'a' : 0.5, 'b' : 0.25, 'c' : 0.25}},
+            'tuples.json' : {
+                'Q' : [[[0, 0], [0, 1], 1], [[0, 1], [0, 0], 1]],
+                'distn' : [[[0, 0], 0.5], [[0, 1], 0.5]]},
+            'negative.json' : {'Q' : [['a', 'b', -1]], 'distn' : uniform},
+            'broken.json' : {'distn' : uniform},
+            }
+
+
+class _ModelDirectory(object):
+    def __enter__(self):
+        self.directory = tempfile.mkdtemp()
+        for name, obj in _get_models().items():
+            with open(os.path.join(self.directory, name), 'w') as fout:
+                json.dump(obj, fout)
+        return self.directory
+
+    def __exit__(self, *args):
+        shutil.rmtree(self.directory)
+
+
+def test_load_model_tuple_states():
+    with _ModelDirectory() as directory:
+        Q, distn = load_model(os.path.join(directory, 'tuples.json'))
+    assert_equal(set(Q), set([(0, 0), (0, 1)]))
+    assert_equal(distn[0, 1], 0.5)
+
+
+def test_validate_model_verdicts():
+    expected = {
+            'ok.json' : ('pass', None),
+            'cycle.json' : ('fail', 'UnweightedDetailedBalanceError'),
+            'bad.json' : ('fail', 'WeightedEquilibriumError'),
+            'tuples.json' : ('pass', None),
+            'negative.json' : ('fail', 'RateMatrixError'),
+            'broken.json' : ('error', 'KeyError'),
+            }
+    with _ModelDirectory() as directory:
+        for name, (verdict, error) in expected.items():
+            result = validate_model(os.path.join(directory, name))
+            assert_equal(result['verdict'], verdict)
+            assert_equal(result['error'], error)
+            assert 'total' in result['timings']
+
+
+def test_validate_model_offending_states():
+    with _ModelDirectory() as directory:
+        result = validate_model(os.path.join(directory, 'negative.json'))
+        assert_equal(result['states'], ['a', 'b'])
+        filename = os.path.join(directory, 'cycle.json')
+        result = validate_model(filename, detailed_balance=False)
+        assert_equal(result['verdict'], 'pass')
+
+
+def test_validate_models_pool():
+    with _ModelDirectory() as directory:
+        filenames = get_model_filenames(directory)
+        results_filename = os.path.join(directory, 'results.txt')
+        with open(results_filename, 'w') as fout:
+            counts = validate_models(filenames, fout,
+                    jobs=2, max_in_flight=3)
+        with open(results_filename) as fin:
+            results = [json.loads(line) for line in fin]
+    assert_equal(counts, {'pass' : 2, 'fail' : 3, 'error' : 1})
+    assert_equal(sorted(r['model'] for r in results), filenames)
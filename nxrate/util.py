@@ -9,19 +9,36 @@ from itertools import combinations
 import random
 
 import networkx as nx
+import numpy as np
+import scipy.sparse
 import scipy.stats
 
 
-def isclose(a, b, rtol=1e-5, atol=1e-8):
+def isclose(a, b, rtol=1e-5, atol=1e-8, dtype=None):
     """
     For assertion use rtol=1e-7 atol=0 instead.
     Following numpy, the relative difference (rtol * abs(b)) and
     the absolute difference atol are added together to compare
     against the absolute difference between a and b.
+    If the values were computed from data stored with a floating point
+    dtype, the relative tolerance is widened to the precision of the dtype.
     """
+    if dtype is not None:
+        rtol = get_rtol(dtype, rtol)
     return abs(a - b) <= (atol + rtol * abs(b))
 
 
+def get_rtol(dtype, rtol=1e-5):
+    """
+    Widen a relative tolerance to the precision of a floating point dtype.
+
+    Rounding a rate and a probability to the dtype and multiplying them
+    gives a flow with a relative error of a few machine epsilons.
+
+    """
+    return max(rtol, 8 * np.finfo(dtype).eps)
+
+
 def get_uniform_distn(states):
     states = set(states)
     nstates = len(states)
@@ -151,3 +168,25 @@ def get_marginal_flows(R):
     return flow_in, flow_out
 
 
+def get_sparse_rate_matrix(Q, states):
+    """
+    Convert a rate matrix to a scipy sparse matrix including the diagonal.
+
+    Rows and columns are ordered according to the states sequence,
+    and each diagonal entry is minus the total rate out of the state.
+
+    """
+    s_to_i = dict((s, i) for i, s in enumerate(states))
+    nstates = len(states)
+    rows = []
+    cols = []
+    data = []
+    for sa, sb in Q.edges():
+        rows.append(s_to_i[sa])
+        cols.append(s_to_i[sb])
+        data.append(Q[sa][sb]['weight'])
+    M = scipy.sparse.coo_matrix(
+            (data, (rows, cols)), shape=(nstates, nstates), dtype=float)
+    exit_rates = np.asarray(M.sum(axis=1)).ravel()
+    M = M.tocsr() - scipy.sparse.diags(exit_rates)
+    return M.tocsr()
@@ -0,0 +1,228 @@
+#!/usr/bin/env python
+"""
+Validate a directory of rate matrix and distribution model files.
+
+Usage:
+
+    $ python -m nxrate.validate models/ --jobs 8 > results.jsonl
+
+Each model file is a JSON object with the following keys.
+    Q : list of [sa, sb, rate] edges of the rate matrix
+    distn : list of [state, probability] pairs,
+        or an object mapping string states to probabilities
+
+JSON lists used as states are converted to tuples.
+Models are checked in a process pool, and one JSON line is written
+for each model as soon as its checks finish, so the output order
+follows completion order rather than file order.
+
+Each result line has the following keys.
+    model : path to the model file
+    verdict : 'pass', 'fail' for a failed check,
+        or 'error' for a model that could not be checked
+    error : name of the exception class, or null
+    message : exception message, or null
+    states : offending states reported by the failed check
+    timings : seconds spent on each stage of the validation
+
+"""
+from __future__ import division, print_function, absolute_import
+
+import argparse
+import fnmatch
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+import networkx as nx
+
+from .testing import (
+        assert_rate_matrix, assert_distn,
+        assert_equilibrium, assert_detailed_balance,
+        CheckError)
+
+__all__ = ['load_model', 'validate_model', 'validate_models']
+
+
+def _as_state(obj):
+    if isinstance(obj, list):
+        return tuple(_as_state(x) for x in obj)
+    return obj
+
+
+def load_model(filename):
+    """
+    Read a rate matrix and a distribution from a JSON model file.
+
+    Returns
+    -------
+    Q : nx.DiGraph
+        rate matrix
+    distn : dict
+        finite distribution
+
+    """
+    with open(filename) as fin:
+        obj = json.load(fin)
+    Q = nx.DiGraph()
+    for sa, sb, rate in obj['Q']:
+        Q.add_edge(_as_state(sa), _as_state(sb), weight=rate)
+    distn_obj = obj['distn']
+    if isinstance(distn_obj, dict):
+        distn = dict(distn_obj)
+    else:
+        distn = dict((_as_state(s), p) for s, p in distn_obj)
+    return Q, distn
+
+
+def validate_model(filename, detailed_balance=True):
+    """
+    Check a single model file and summarize the outcome as a dict.
+
+    This function does not raise for invalid models,
+    so that it can be used as a process pool task.
+
+    """
+    result = {
+            'model' : filename,
+            'verdict' : 'pass',
+            'error' : None,
+            'message' : None,
+            'states' : [],
+            'timings' : {},
+            }
+    timings = result['timings']
+    stages = [
+            ('load', None),
+            ('inputs', None),
+            ('equilibrium', assert_equilibrium),
+            ]
+    if detailed_balance:
+        stages.append(('detailed_balance', assert_detailed_balance))
+    tm_start = time.time()
+    Q = distn = None
+    try:
+        for name, check in stages:
+            tm = time.time()
+            try:
+                if name == 'load':
+                    Q, distn = load_model(filename)
+                elif name == 'inputs':
+                    assert_rate_matrix(Q)
+                    assert_distn(distn)
+                else:
+                    check(Q, distn, check_inputs=False)
+            finally:
+                timings[name] = time.time() - tm
+    except CheckError as e:
+        result['verdict'] = 'fail'
+        result['error'] = e.__class__.__name__
+        result['message'] = str(e)
+        result['states'] = e.states
+    except Exception as e:
+        result['verdict'] = 'error'
+        result['error'] = e.__class__.__name__
+        result['message'] = str(e)
+    timings['total'] = time.time() - tm_start
+    return result
+
+
+def validate_models(filenames, fout, jobs=None, max_in_flight=None,
+        detailed_balance=True):
+    """
+    Validate model files in a process pool, streaming JSON lines.
+
+    Parameters
+    ----------
+    filenames : iterable
+        paths to model files
+    fout : file
+        open text file to which one JSON line is written per model
+    jobs : int, optional
+        number of worker processes, defaulting to the number of CPUs
+    max_in_flight : int, optional
+        maximum number of submitted but unfinished models,
+        defaulting to twice the number of worker processes
+    detailed_balance : bool, optional
+        also check detailed balance
+
+    Returns
+    -------
+    counts : dict
+        number of models with each verdict
+
+    """
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+    if max_in_flight is None:
+        max_in_flight = 2 * jobs
+    if jobs < 1 or max_in_flight < 1:
+        raise Exception('the number of jobs and the number of models '
+                'in flight must be positive')
+    counts = {'pass' : 0, 'fail' : 0, 'error' : 0}
+    filenames = iter(filenames)
+    pending = set()
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        while True:
+            # Keep the pool busy without queueing every model at once.
+            for filename in filenames:
+                pending.add(executor.submit(
+                    validate_model, filename, detailed_balance))
+                if len(pending) >= max_in_flight:
+                    break
+            if not pending:
+                break
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                result = future.result()
+                counts[result['verdict']] += 1
+                fout.write(json.dumps(result, default=str) + '\n')
+            fout.flush()
+    return counts
+
+
+def get_model_filenames(directory, pattern='*.json'):
+    names = sorted(fnmatch.filter(os.listdir(directory), pattern))
+    return [os.path.join(directory, name) for name in names]
+
+
+def main(args):
+    filenames = get_model_filenames(args.directory, args.pattern)
+    if args.output is None:
+        counts = validate_models(filenames, sys.stdout,
+                args.jobs, args.max_in_flight, args.detailed_balance)
+    else:
+        with open(args.output, 'w') as fout:
+            counts = validate_models(filenames, fout,
+                    args.jobs, args.max_in_flight, args.detailed_balance)
+    print('pass: %d  fail: %d  error: %d' % (
+        counts['pass'], counts['fail'], counts['error']), file=sys.stderr)
+    if counts['fail'] or counts['error']:
+        sys.exit(1)
+    else:
+        sys.exit(0)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+            description='validate rate matrix and distribution model files')
+    parser.add_argument('directory',
+            help='directory containing the model files')
+    parser.add_argument('--pattern', default='*.json',
+            help='filename pattern of model files [default: *.json]')
+    parser.add_argument('--jobs', '-j', type=int, default=None,
+            help='number of worker processes [default: number of CPUs]')
+    parser.add_argument('--max-in-flight', type=int, default=None,
+            help='maximum number of models submitted to the pool '
+                    'but not yet finished [default: twice the jobs]')
+    parser.add_argument('--output', '-o', default=None,
+            help='write JSON lines to this file [default: stdout]')
+    parser.add_argument('--no-detailed-balance', dest='detailed_balance',
+            action='store_false',
+            help='skip the detailed balance check')
+    # Pool tasks are pickled by reference, so they must come from
+    # the importable module rather than from __main__.
+    from nxrate.validate import main
+    main(parser.parse_args())